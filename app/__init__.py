@@ -12,6 +12,21 @@ A minimal workflow/graph execution engine that supports:
 __version__ = "1.0.0"
 __author__ = "AI Engineering Intern"
 
+import logging
+import os
+import warnings
+
+# Silent by default; set WORKFLOW_LOG_LEVEL (e.g. DEBUG) to log to stderr
+_logger = logging.getLogger("app")
+_logger.addHandler(logging.NullHandler())
+_log_level = os.environ.get("WORKFLOW_LOG_LEVEL", "").strip().upper()
+if _log_level:
+    if isinstance(logging.getLevelName(_log_level), int):
+        _logger.setLevel(_log_level)
+        _logger.addHandler(logging.StreamHandler())
+    else:
+        warnings.warn(f"Ignoring unknown WORKFLOW_LOG_LEVEL '{_log_level}'")
+
 # Import main components for easy access
 from app.graph_engine import graph_engine
 from app.tools import tool_registry
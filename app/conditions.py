@@ -0,0 +1,168 @@
+"""
+Condition compiler for edge and loop expressions.
+
+Expressions such as "quality_score >= 70 or iteration >= 3" are parsed once
+into plain Python closures over the state dict. Anything outside the supported
+subset (names, constants, comparisons, and/or/not) falls back to a compiled
+eval with no builtins.
+"""
+
+import ast
+import operator
+from typing import Any, Callable, Dict
+
+Predicate = Callable[[Dict[str, Any]], Any]
+
+_COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+_SINGLETONS = (None, True, False)
+
+# Fallback evaluation resolves names straight from the state mapping
+_EVAL_GLOBALS: Dict[str, Any] = {"__builtins__": {}}
+
+
+class _Unsupported(Exception):
+    """Raised for expressions the closure builder does not handle"""
+
+
+def compile_condition(expression: str) -> Predicate:
+    """Compile a condition string into a callable taking the state dict"""
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid condition '{expression}': {e}")
+
+    # State is passed as eval locals, so ':=' would write into it
+    if any(isinstance(node, ast.NamedExpr) for node in ast.walk(tree)):
+        raise ValueError(f"Invalid condition '{expression}': assignment is not allowed")
+
+    try:
+        return _build(tree.body)
+    except _Unsupported:
+        code = compile(tree, "<condition>", "eval")
+        return lambda state: eval(code, _EVAL_GLOBALS, state)
+
+
+def _build(node: ast.AST) -> Predicate:
+    """Build a closure for a single AST node"""
+    if isinstance(node, ast.Name):
+        key = node.id
+        return lambda state: state[key]
+
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda state: value
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        if not isinstance(node.operand, ast.Constant):
+            raise _Unsupported("USub")
+        try:
+            value = -node.operand.value
+        except TypeError:
+            raise _Unsupported("USub")
+        return lambda state: value
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        operand = _build(node.operand)
+        return lambda state: not operand(state)
+
+    if isinstance(node, ast.BoolOp):
+        return _build_bool_op(node)
+
+    if isinstance(node, ast.Compare):
+        return _build_compare(node)
+
+    raise _Unsupported(type(node).__name__)
+
+
+def _is_plain_literal(node: ast.AST) -> bool:
+    """Literal other than None/True/False, including negative numbers"""
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return True
+    return isinstance(node, ast.Constant) and not any(
+        node.value is singleton for singleton in _SINGLETONS
+    )
+
+
+def _build_bool_op(node: ast.BoolOp) -> Predicate:
+    """Build and/or with Python's short-circuit semantics"""
+    values = [_build(value) for value in node.values]
+
+    if isinstance(node.op, ast.And):
+        if len(values) == 2:
+            left, right = values
+            return lambda state: left(state) and right(state)
+
+        def and_(state):
+            result = True
+            for value in values:
+                result = value(state)
+                if not result:
+                    return result
+            return result
+        return and_
+
+    if len(values) == 2:
+        left, right = values
+        return lambda state: left(state) or right(state)
+
+    def or_(state):
+        result = False
+        for value in values:
+            result = value(state)
+            if result:
+                return result
+        return result
+    return or_
+
+
+def _build_compare(node: ast.Compare) -> Predicate:
+    """Build a (possibly chained) comparison"""
+    ops = []
+    for op in node.ops:
+        if type(op) not in _COMPARE_OPS:
+            raise _Unsupported(type(op).__name__)
+        ops.append(_COMPARE_OPS[type(op)])
+
+    # Identity against literals other than singletons depends on how the
+    # compiler merges and interns constants, so leave it to eval
+    operands = [node.left] + node.comparators
+    for i, op in enumerate(node.ops):
+        if isinstance(op, (ast.Is, ast.IsNot)) and any(
+            _is_plain_literal(operand) for operand in operands[i:i + 2]
+        ):
+            raise _Unsupported(type(op).__name__)
+
+    # Common case: "key op constant" is a dict lookup and one comparison
+    if (len(ops) == 1 and isinstance(node.left, ast.Name)
+            and isinstance(node.comparators[0], ast.Constant)):
+        key, op, value = node.left.id, ops[0], node.comparators[0].value
+        return lambda state: op(state[key], value)
+
+    left = _build(node.left)
+    comparators = [_build(comparator) for comparator in node.comparators]
+
+    if len(ops) == 1:
+        op, right = ops[0], comparators[0]
+        return lambda state: op(left(state), right(state))
+
+    def chain(state):
+        lhs = left(state)
+        for op, comparator in zip(ops, comparators):
+            rhs = comparator(state)
+            if not op(lhs, rhs):
+                return False
+            lhs = rhs
+        return True
+    return chain
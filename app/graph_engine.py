@@ -1,11 +1,217 @@
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+import time
 import uuid
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, FrozenSet, List, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
 from app.models import (
     GraphDefinition, Node, Edge, NodeType,
     ExecutionLog, GraphRunResponse
 )
 from app.tools import tool_registry
+from app.conditions import Predicate, compile_condition
+
+logger = logging.getLogger(__name__)
+
+MAX_PARALLEL_WORKERS = 4  # Thread pool size for parallel graphs
+MAX_ITERATIONS = 100  # Safety limit on nodes executed by a serial run
+# Per stored run, older logs are spilled to disk. Kept below MAX_ITERATIONS
+# so long-running loops spill, not only large parallel graphs
+MAX_LOGS_IN_MEMORY = 50
+RUN_TTL_SECONDS = 30 * 60  # Stored runs older than this are dropped
+SPILL_READ_TIMEOUT_SECONDS = 10  # Longest a read waits for the run's pending spill writes
+# Resolved once so a later chdir doesn't move it
+LOG_SPILL_DIR = os.path.abspath(os.environ.get("WORKFLOW_LOG_DIR", "logs"))
+
+_MISSING = object()
+
+
+class StateConflictError(RuntimeError):
+    """Raised when parallel nodes not ordered by any path write the same state key"""
+
+
+def _snapshot(state_before: Dict[str, Any], state_after: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the keys whose value changed or were removed, mapped to their previous value"""
+    changed = {
+        key: state_before.get(key, _MISSING)
+        for key in state_after
+        if state_after[key] is not state_before.get(key, _MISSING)
+    }
+    # Keys the node deleted, only scanned for when the key counts don't add up
+    added = sum(1 for value in changed.values() if value is _MISSING)
+    if len(state_before) + added > len(state_after):
+        changed.update(
+            (key, value) for key, value in state_before.items() if key not in state_after
+        )
+    return changed
+
+
+def _format_timestamp(timestamp_ns: int) -> str:
+    """Format a time.time_ns() value like datetime.now().isoformat()"""
+    seconds, nanoseconds = divmod(timestamp_ns, 1_000_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=nanoseconds // 1000).isoformat()
+
+
+@dataclass(slots=True)
+class _ExecLog:
+    """Internal per-node log record, converted to ExecutionLog at the API boundary"""
+    node_name: str
+    state_before_diff: Dict[str, Any]
+    state_after_diff: Dict[str, Any]
+    removed_keys: List[str]
+    timestamp: int  # time.time_ns(), formatted to ISO only in to_model
+    
+    def to_model(
+        self, 
+        state_before: Optional[Dict[str, Any]] = None, 
+        state_after: Optional[Dict[str, Any]] = None
+    ) -> ExecutionLog:
+        """Build the API model without re-validating engine-produced data"""
+        return ExecutionLog.model_construct(
+            node_name=self.node_name,
+            state_before_diff=self.state_before_diff,
+            state_after_diff=self.state_after_diff,
+            removed_keys=self.removed_keys,
+            timestamp=_format_timestamp(self.timestamp),
+            state_before=state_before,
+            state_after=state_after
+        )
+
+
+class _LogSpill:
+    """Background writer that appends spilled execution logs to {run_id}.jsonl"""
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._queue: "queue.Queue[Tuple[str, Optional[List[_ExecLog]]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        # path -> queued operations not yet done, guarded by _cond
+        self._pending: Dict[str, int] = {}
+        self._cond = threading.Condition()
+    
+    def write(self, run_id: str, logs: List[_ExecLog]) -> None:
+        """Queue logs to be appended to the run's file"""
+        self._submit(run_id, logs)
+    
+    def delete(self, run_id: str) -> None:
+        """Queue removal of the run's file"""
+        self._submit(run_id, None)
+    
+    def read(self, run_id: str) -> List[_ExecLog]:
+        """Read back spilled logs once the run's pending writes are done"""
+        path = self._path(run_id)
+        with self._cond:
+            done = self._cond.wait_for(
+                lambda: path not in self._pending, timeout=SPILL_READ_TIMEOUT_SECONDS
+            )
+        if not done:
+            logger.warning("Timed out waiting for spilled logs at %s, reading them as is", path)
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            return [_ExecLog(**json.loads(line)) for line in f]
+    
+    def _path(self, run_id: str) -> str:
+        return os.path.join(self.directory, f"{run_id}.jsonl")
+    
+    def _submit(self, run_id: str, logs: Optional[List[_ExecLog]]) -> None:
+        path = self._path(run_id)
+        with self._cond:
+            # Also restart a writer that died, so queued work isn't stranded
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._work, name="log-spill", daemon=True)
+                self._thread.start()
+            self._pending[path] = self._pending.get(path, 0) + 1
+        self._queue.put((path, logs))
+    
+    def _prune(self) -> None:
+        """Remove spill files untouched for RUN_TTL_SECONDS, e.g. left by a previous process"""
+        cutoff = time.time() - RUN_TTL_SECONDS
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".jsonl") and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("Failed to prune spilled logs in %s: %s", self.directory, e)
+    
+    def _work(self) -> None:
+        # Runs are only tracked in memory, so files of expired runs from earlier
+        # processes can't be swept; age them out on first use and every TTL
+        next_prune = 0.0
+        while True:
+            if time.monotonic() >= next_prune:
+                self._prune()
+                next_prune = time.monotonic() + RUN_TTL_SECONDS
+            try:
+                path, logs = self._queue.get(timeout=RUN_TTL_SECONDS)
+            except queue.Empty:
+                continue
+            try:
+                if logs is None:
+                    if os.path.exists(path):
+                        os.remove(path)
+                else:
+                    os.makedirs(self.directory, exist_ok=True)
+                    with open(path, "a", encoding="utf-8") as f:
+                        for log in logs:
+                            # Same encoding the API applies, so read-back logs render identically
+                            f.write(json.dumps(jsonable_encoder(asdict(log))) + "\n")
+            except Exception as e:
+                # Any error (e.g. RecursionError encoding a self-referencing state)
+                # must not end the writer, or later reads would wait on it
+                logger.warning("Failed to update spilled logs at %s: %s", path, e)
+            finally:
+                with self._cond:
+                    self._pending[path] -= 1
+                    if not self._pending[path]:
+                        del self._pending[path]
+                        self._cond.notify_all()
+
+
+# (condition or None for a default edge, to_node)
+Route = Tuple[Optional[Predicate], str]
+
+# Routing kinds, used to index GraphEngine._next_handlers
+_SIMPLE, _CONDITIONAL, _LOOP = 0, 1, 2
+
+
+@dataclass(slots=True, frozen=True)
+class _RTEdge:
+    """Runtime copy of an Edge"""
+    to_node: str
+    condition: Optional[str]
+    is_exit: bool
+
+
+@dataclass(slots=True, frozen=True)
+class _ParallelPlan:
+    """Successors and ancestors of every node reachable in a parallel graph"""
+    successors: Dict[str, List[str]]
+    ancestors: Dict[str, FrozenSet[str]]
+
+
+@dataclass(slots=True, frozen=True)
+class _RTNode:
+    """Runtime copy of a Node with its tool and routing resolved"""
+    name: str
+    node_type: NodeType
+    tool_name: str
+    tool: Callable[[Dict[str, Any]], Dict[str, Any]]
+    cache_keys: Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]
+    kind_tag: int  # _SIMPLE, _CONDITIONAL or _LOOP
+    routes: List[Route]
+    exit_to: Optional[str]  # Loop exit target
 
 
 class GraphEngine:
@@ -14,42 +220,222 @@ class GraphEngine:
     def __init__(self):
         self.graphs: Dict[str, GraphDefinition] = {}
         self.runs: Dict[str, Dict[str, Any]] = {}
+        self._log_spill = _LogSpill(LOG_SPILL_DIR)
+        self._nodes: Dict[str, Dict[str, _RTNode]] = {}
+        self._end_nodes: Dict[str, FrozenSet[str]] = {}
+        self._parallel_plans: Dict[str, Optional[_ParallelPlan]] = {}
+        # Indexed by _RTNode.kind_tag
+        self._next_handlers = (self._simple_next, self._conditional_next, self._loop_next)
     
     def create_graph(self, graph_def: GraphDefinition, name: str = "unnamed") -> str:
         """Create and store a graph definition"""
+        # Runs only touch these slotted runtime records, not the Pydantic models
+        edges_map = self._build_edges_map(graph_def.edges)
+        nodes = self._compile_nodes(graph_def, edges_map)
+        
         graph_id = str(uuid.uuid4())
         self.graphs[graph_id] = graph_def
-        print(f"Graph '{name}' created with ID: {graph_id}")
+        self._nodes[graph_id] = nodes
+        self._end_nodes[graph_id] = frozenset(graph_def.end_nodes)
+        self._parallel_plans[graph_id] = self._plan_parallel(graph_def, nodes, edges_map)
+        logger.info("Graph '%s' created with ID: %s", name, graph_id)
         return graph_id
     
-    def run_graph(self, graph_id: str, initial_state: Dict[str, Any]) -> GraphRunResponse:
-        """Execute a graph with given initial state"""
+    def _compile_nodes(
+        self, 
+        graph_def: GraphDefinition, 
+        edges_map: Dict[str, List[_RTEdge]]
+    ) -> Dict[str, _RTNode]:
+        """Resolve tools, loop conditions and routing for every node"""
+        nodes = {}
+        for node in graph_def.nodes:
+            expression = node.condition.get("expression", "") if node.condition else ""
+            kind_tag, routes, exit_to = self._compile_routing(
+                node,
+                compile_condition(expression) if expression else None,
+                edges_map.get(node.name)
+            )
+            nodes[node.name] = _RTNode(
+                name=node.name,
+                node_type=node.node_type,
+                tool_name=node.tool_name,
+                # Fail fast on unknown tools
+                tool=tool_registry.get(node.tool_name),
+                cache_keys=tool_registry.get_keys(node.tool_name),
+                kind_tag=kind_tag,
+                routes=routes,
+                exit_to=exit_to
+            )
+        return nodes
+    
+    def _compile_routing(
+        self, 
+        node: Node, 
+        predicate: Optional[Predicate], 
+        edges: Optional[List[_RTEdge]]
+    ) -> Tuple[int, List[Route], Optional[str]]:
+        """Precompute (kind_tag, routes, exit_to) for a node"""
+        if not edges:
+            return _SIMPLE, [], None
+        
+        if node.node_type is NodeType.CONDITIONAL:
+            # Only conditional edges are evaluated, loop edges just mark the exit
+            routes = [
+                (compile_condition(edge.condition), edge.to_node)
+                for edge in edges if edge.condition
+            ]
+            # Default edge (no condition), falling back to the first edge
+            default_to = next(
+                (edge.to_node for edge in edges if not edge.condition),
+                edges[0].to_node
+            )
+            routes.append((None, default_to))
+            return _CONDITIONAL, routes, None
+        
+        if node.node_type is NodeType.LOOP:
+            # The loop repeats the node while its condition is not met
+            routes = [(predicate, node.name)] if predicate else []
+            return _LOOP, routes, self._find_exit_node(edges)
+        
+        return _SIMPLE, [(None, edges[0].to_node)], None
+    
+    def _plan_parallel(
+        self, 
+        graph_def: GraphDefinition, 
+        nodes: Dict[str, _RTNode], 
+        edges_map: Dict[str, List[_RTEdge]]
+    ) -> Optional[_ParallelPlan]:
+        """Return the reachable nodes' successors and ancestors if the graph can run in parallel"""
+        if not graph_def.parallel:
+            return None
+        
+        end_nodes = set(graph_def.end_nodes)
+        successors: Dict[str, List[str]] = {}
+        pending = [graph_def.start_node]
+        while pending:
+            name = pending.pop()
+            if name in successors or name in end_nodes:
+                continue
+            if name not in nodes:
+                raise ValueError(f"Node '{name}' not found in graph")
+            
+            # Conditional and loop nodes pick a single route, keep the serial path
+            if nodes[name].node_type is not NodeType.SIMPLE:
+                logger.debug("Graph has branching or loop nodes, running serially")
+                return None
+            
+            successors[name] = [
+                edge.to_node for edge in edges_map.get(name, [])
+                if edge.to_node not in end_nodes
+            ]
+            pending.extend(successors[name])
+        
+        # Kahn's algorithm: nodes left unvisited are part of a cycle. A node is
+        # only popped once all its predecessors are, so its ancestors are complete
+        in_degree = self._in_degree(successors)
+        ready = deque(name for name, degree in in_degree.items() if degree == 0)
+        ancestors: Dict[str, set] = {name: set() for name in successors}
+        visited = 0
+        while ready:
+            visited += 1
+            name = ready.popleft()
+            for successor in successors[name]:
+                ancestors[successor].update(ancestors[name])
+                ancestors[successor].add(name)
+                in_degree[successor] -= 1
+                if in_degree[successor] == 0:
+                    ready.append(successor)
+        
+        if visited < len(successors):
+            logger.debug("Graph has cycles, running serially")
+            return None
+        return _ParallelPlan(
+            successors=successors,
+            ancestors={name: frozenset(names) for name, names in ancestors.items()}
+        )
+    
+    def _in_degree(self, successors: Dict[str, List[str]]) -> Dict[str, int]:
+        """Count incoming edges per node"""
+        in_degree = {name: 0 for name in successors}
+        for targets in successors.values():
+            for target in targets:
+                in_degree[target] += 1
+        return in_degree
+    
+    def run_graph(
+        self, 
+        graph_id: str, 
+        initial_state: Dict[str, Any], 
+        trace: bool = False
+    ) -> GraphRunResponse:
+        """Execute a graph with given initial state, optionally recording a trace"""
         if graph_id not in self.graphs:
             raise ValueError(f"Graph {graph_id} not found")
         
-        graph = self.graphs[graph_id]
         run_id = str(uuid.uuid4())
+        self._sweep_runs()
         
         # Initialize run tracking
         state = initial_state.copy()
-        execution_logs: List[ExecutionLog] = []
+        execution_logs: List[_ExecLog] = []
+        trace_log: Optional[List[str]] = [] if trace else None
+        
+        logger.debug("Starting graph execution (run_id: %s)", run_id)
+        
+        plan = self._parallel_plans[graph_id]
+        if plan is not None:
+            state = self._run_parallel(graph_id, plan, state, execution_logs, trace_log)
+        else:
+            state = self._run_serial(graph_id, state, execution_logs, trace_log)
+        
+        # Store run results
+        self.runs[run_id] = {
+            "graph_id": graph_id,
+            "initial_state": initial_state.copy(),
+            "state": state,
+            "logs": self._store_logs(run_id, execution_logs),
+            "trace": trace_log,
+            "status": "completed",
+            "current_node": None,
+            "spilled": len(execution_logs) > MAX_LOGS_IN_MEMORY,
+            "created_at": time.monotonic()
+        }
+        
+        logger.debug("Graph execution completed (run_id: %s)", run_id)
+        
+        return GraphRunResponse(
+            run_id=run_id,
+            final_state=state,
+            execution_logs=[log.to_model() for log in execution_logs],
+            status="completed",
+            trace=trace_log
+        )
+    
+    def _run_serial(
+        self, 
+        graph_id: str, 
+        state: Dict[str, Any], 
+        execution_logs: List[_ExecLog], 
+        trace_log: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """Follow a single path through the graph, one node at a time"""
+        graph = self.graphs[graph_id]
         current_node_name = graph.start_node
-        visited_nodes = set()
-        max_iterations = 100  # Safety limit
         iteration = 0
         
-        print(f"\n=== Starting graph execution (run_id: {run_id}) ===")
-        
-        # Build node and edge mappings
-        nodes_map = {node.name: node for node in graph.nodes}
-        edges_map = self._build_edges_map(graph.edges)
+        # Node lookup and routing are precompiled at graph creation
+        nodes_map = self._nodes[graph_id]
+        end_nodes = self._end_nodes[graph_id]
+        cache: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
         
-        while current_node_name and iteration < max_iterations:
+        while current_node_name and iteration < MAX_ITERATIONS:
             iteration += 1
             
             # Check if we reached an end node
-            if current_node_name in graph.end_nodes:
-                print(f"Reached end node: {current_node_name}")
+            if current_node_name in end_nodes:
+                logger.debug("Reached end node: %s", current_node_name)
+                if trace_log is not None:
+                    trace_log.append(f"Reached end node: {current_node_name}")
                 break
             
             # Get current node
@@ -59,161 +445,265 @@ class GraphEngine:
             current_node = nodes_map[current_node_name]
             
             # Execute node
-            print(f"\nExecuting node: {current_node_name} (type: {current_node.node_type})")
-            state_before = state.copy()
+            self._trace_node(current_node, trace_log)
+            # Shallow, transient copy: tools mutate state in place
+            state_before = dict(state)
             
-            state = self._execute_node(current_node, state)
-            
-            # Log execution
-            execution_logs.append(ExecutionLog(
-                node_name=current_node_name,
-                state_before=state_before,
-                state_after=state.copy(),
-                timestamp=datetime.now().isoformat()
-            ))
+            state = self._execute_node(current_node, state, cache)
             
-            # Determine next node
-            next_node = self._get_next_node(
-                current_node, 
-                current_node_name, 
-                edges_map, 
-                state
+            # Log only what the node changed
+            self._log_execution(
+                execution_logs, current_node_name, _snapshot(state_before, state), state
             )
             
-            if next_node == current_node_name and current_node.node_type == NodeType.LOOP:
-                # Loop condition check
-                if not self._check_loop_condition(current_node, state):
-                    # Exit loop, find next node after loop
-                    next_node = self._find_exit_node(current_node_name, edges_map, state)
-                    print(f"Loop condition not met, exiting to: {next_node}")
-            
-            current_node_name = next_node
+            # Determine next node
+            current_node_name = self._get_next_node(current_node, state)
+            if trace_log is not None:
+                trace_log.append(f"Next node: {current_node_name}")
         
-        if iteration >= max_iterations:
-            print(f"WARNING: Max iterations ({max_iterations}) reached")
+        if iteration >= MAX_ITERATIONS:
+            logger.warning("Max iterations (%d) reached", MAX_ITERATIONS)
+            if trace_log is not None:
+                trace_log.append(f"Max iterations ({MAX_ITERATIONS}) reached")
         
-        # Store run results
-        self.runs[run_id] = {
-            "graph_id": graph_id,
-            "state": state,
-            "logs": execution_logs,
-            "status": "completed",
-            "current_node": None
-        }
+        return state
+    
+    def _run_parallel(
+        self, 
+        graph_id: str, 
+        plan: _ParallelPlan, 
+        state: Dict[str, Any], 
+        execution_logs: List[_ExecLog], 
+        trace_log: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """Run every node once, executing nodes whose predecessors are done concurrently"""
+        nodes_map = self._nodes[graph_id]
+        successors, ancestors = plan.successors, plan.ancestors
+        in_degree = self._in_degree(successors)
+        ready = deque(name for name, degree in in_degree.items() if degree == 0)
+        initial_state = dict(state)
+        # (node name, changed keys, node state) in completion order
+        merged: List[Tuple[str, Dict[str, Any], Dict[str, Any]]] = []
+        # key -> node that last wrote it
+        written_by: Dict[str, str] = {}
+        cache: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
         
-        print(f"\n=== Graph execution completed ===")
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_WORKERS) as executor:
+            running: Dict[Future, Tuple[str, Dict[str, Any]]] = {}
+            while ready or running:
+                while ready:
+                    node = nodes_map[ready.popleft()]
+                    self._trace_node(node, trace_log)
+                    # Nodes only see their ancestors' writes, so inputs don't depend
+                    # on which unrelated nodes happened to finish first
+                    state_before = dict(initial_state)
+                    for writer, changed, node_state in merged:
+                        if writer in ancestors[node.name]:
+                            self._merge_changes(state_before, changed, node_state)
+                    future = executor.submit(self._execute_node, node, dict(state_before), cache)
+                    running[future] = (node.name, state_before)
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, state_before = running.pop(future)
+                    node_state = future.result()
+                    changed = _snapshot(state_before, node_state)
+                    
+                    # Nodes not ordered by a path must write disjoint keys. Checking
+                    # the last writer is enough: earlier writers are its ancestors
+                    for key in changed:
+                        writer = written_by.get(key)
+                        if writer is not None and writer not in ancestors[name]:
+                            raise StateConflictError(
+                                f"Parallel nodes '{writer}' and '{name}' "
+                                f"both wrote state key '{key}'"
+                            )
+                        written_by[key] = name
+                    
+                    self._merge_changes(state, changed, node_state)
+                    merged.append((name, changed, node_state))
+                    self._log_execution(execution_logs, name, changed, node_state)
+                    
+                    for successor in successors[name]:
+                        in_degree[successor] -= 1
+                        if in_degree[successor] == 0:
+                            ready.append(successor)
         
-        return GraphRunResponse(
-            run_id=run_id,
-            final_state=state,
-            execution_logs=execution_logs,
-            status="completed"
-        )
+        return state
     
-    def _execute_node(self, node: Node, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute a single node"""
-        # Get the tool function
-        tool_func = tool_registry.get(node.tool_name)
-        
-        # Execute the tool
-        return tool_func(state)
+    def _merge_changes(
+        self, 
+        state: Dict[str, Any], 
+        changed: Dict[str, Any], 
+        node_state: Dict[str, Any]
+    ) -> None:
+        """Apply a node's changed and removed keys, as returned by _snapshot, to state"""
+        for key in changed:
+            if key in node_state:
+                state[key] = node_state[key]
+            else:
+                state.pop(key, None)
     
-    def _build_edges_map(self, edges: List[Edge]) -> Dict[str, List[Edge]]:
-        """Build a mapping of from_node -> list of edges"""
-        edges_map = {}
-        for edge in edges:
-            if edge.from_node not in edges_map:
-                edges_map[edge.from_node] = []
-            edges_map[edge.from_node].append(edge)
-        return edges_map
+    def _trace_node(self, node: _RTNode, trace_log: Optional[List[str]]) -> None:
+        """Log a node about to be executed"""
+        logger.debug("Executing node: %s (type: %s)", node.name, node.node_type.value)
+        if trace_log is not None:
+            trace_log.append(f"Executing node: {node.name} (type: {node.node_type.value})")
     
-    def _get_next_node(
+    def _log_execution(
         self, 
-        current_node: Node, 
-        current_node_name: str, 
-        edges_map: Dict[str, List[Edge]], 
-        state: Dict[str, Any]
-    ) -> Optional[str]:
-        """Determine the next node to execute"""
+        execution_logs: List[_ExecLog], 
+        node_name: str, 
+        changed: Dict[str, Any], 
+        state_after: Dict[str, Any]
+    ) -> None:
+        """Record only the keys a node changed, as returned by _snapshot"""
+        execution_logs.append(_ExecLog(
+            node_name=node_name,
+            state_before_diff={
+                key: value for key, value in changed.items() if value is not _MISSING
+            },
+            state_after_diff={key: state_after[key] for key in changed if key in state_after},
+            removed_keys=[key for key in changed if key not in state_after],
+            timestamp=time.time_ns()
+        ))
+    
+    def _execute_node(
+        self, 
+        node: _RTNode, 
+        state: Dict[str, Any], 
+        cache: Optional[Dict[Tuple[Any, ...], Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Execute a single node, reusing outputs if its declared inputs were seen before"""
+        if cache is None or node.cache_keys is None:
+            return node.tool(state)
         
-        if current_node_name not in edges_map:
-            return None
+        input_keys, output_keys = node.cache_keys
+        key = (node.tool_name, tuple(state.get(k, _MISSING) for k in input_keys))
+        try:
+            outputs = cache.get(key)
+        except TypeError:
+            # Unhashable input values, e.g. lists
+            return node.tool(state)
         
-        edges = edges_map[current_node_name]
+        # Copies on both sides: later nodes may mutate output lists in place
+        if outputs is not None:
+            logger.debug("Reusing cached outputs for node: %s", node.name)
+            state.update(copy.deepcopy(outputs))
+            return state
         
-        # Handle conditional nodes
-        if current_node.node_type == NodeType.CONDITIONAL:
-            for edge in edges:
-                if edge.condition and self._evaluate_condition(edge.condition, state):
-                    print(f"Condition '{edge.condition}' met, going to: {edge.to_node}")
-                    return edge.to_node
-            
-            # Default edge (no condition)
-            for edge in edges:
-                if not edge.condition:
-                    return edge.to_node
-        
-        # Handle loop nodes
-        elif current_node.node_type == NodeType.LOOP:
-            if self._check_loop_condition(current_node, state):
-                # Continue loop
-                return current_node_name
-            else:
-                # Exit loop
-                return self._find_exit_node(current_node_name, edges_map, state)
-        
-        # Simple node - return first edge
-        return edges[0].to_node if edges else None
+        state = node.tool(state)
+        cache[key] = copy.deepcopy({k: state[k] for k in output_keys if k in state})
+        return state
     
-    def _check_loop_condition(self, node: Node, state: Dict[str, Any]) -> bool:
-        """Check if loop should continue"""
-        if not node.condition:
-            return False
-        
-        condition_str = node.condition.get("expression", "")
-        return not self._evaluate_condition(condition_str, state)
+    def _build_edges_map(self, edges: List[Edge]) -> Dict[str, List[_RTEdge]]:
+        """Build a mapping of from_node -> list of edges"""
+        edges_map = defaultdict(list)
+        for edge in edges:
+            edges_map[edge.from_node].append(_RTEdge(
+                to_node=edge.to_node,
+                condition=edge.condition,
+                is_exit=bool(edge.condition) and "exit" in edge.condition.lower()
+            ))
+        return dict(edges_map)
     
-    def _find_exit_node(
-        self, 
-        loop_node: str, 
-        edges_map: Dict[str, List[Edge]], 
-        state: Dict[str, Any]
-    ) -> Optional[str]:
-        """Find the exit node from a loop"""
-        if loop_node not in edges_map:
-            return None
-        
-        edges = edges_map[loop_node]
-        
+    def _get_next_node(self, node: _RTNode, state: Dict[str, Any]) -> Optional[str]:
+        """Determine the next node to execute"""
+        return self._next_handlers[node.kind_tag](node, state)
+    
+    def _simple_next(self, node: _RTNode, state: Dict[str, Any]) -> Optional[str]:
+        """Simple node - return first edge"""
+        return node.routes[0][1] if node.routes else None
+    
+    def _conditional_next(self, node: _RTNode, state: Dict[str, Any]) -> Optional[str]:
+        """Conditional node - return the first edge whose condition is met"""
+        for predicate, to_node in node.routes:
+            if predicate is None:
+                return to_node
+            if self._evaluate_condition(predicate, state):
+                logger.debug("Condition met, going to: %s", to_node)
+                return to_node
+        return None
+    
+    def _loop_next(self, node: _RTNode, state: Dict[str, Any]) -> Optional[str]:
+        """Loop node - repeat until the loop condition is met, then exit"""
+        for predicate, to_node in node.routes:
+            if not self._evaluate_condition(predicate, state):
+                # Continue loop
+                return to_node
+        logger.debug("Loop condition met, exiting to: %s", node.exit_to)
+        return node.exit_to
+    
+    def _find_exit_node(self, edges: List[_RTEdge]) -> Optional[str]:
+        """Find the exit node from a loop's outgoing edges"""
         # Look for an exit edge (usually marked with condition "exit")
         for edge in edges:
-            if edge.condition and "exit" in edge.condition.lower():
+            if edge.is_exit:
                 return edge.to_node
         
         # If no explicit exit edge, return last edge
         return edges[-1].to_node if edges else None
     
-    def _evaluate_condition(self, condition: str, state: Dict[str, Any]) -> bool:
-        """Evaluate a condition string against state"""
+    def _evaluate_condition(self, condition: Predicate, state: Dict[str, Any]) -> bool:
+        """Evaluate a compiled condition against state"""
         try:
-            # Simple condition evaluation
-            # Format: "key operator value" e.g., "quality_score >= 70"
-            
-            # Replace state variables
-            eval_str = condition
-            for key, value in state.items():
-                eval_str = eval_str.replace(key, str(value))
-            
-            # Safely evaluate
-            result = eval(eval_str, {"__builtins__": {}}, {})
-            return bool(result)
+            # State keys are resolved as plain names, e.g. "quality_score >= 70"
+            return bool(condition(state))
         except Exception as e:
-            print(f"Error evaluating condition '{condition}': {e}")
+            logger.warning("Error evaluating condition: %s", e)
             return False
     
-    def get_run_state(self, run_id: str) -> Optional[Dict[str, Any]]:
-        """Get the state of a completed run"""
-        return self.runs.get(run_id)
+    def get_run_state(self, run_id: str, full_state: bool = False) -> Optional[Dict[str, Any]]:
+        """Get the state of a completed run, optionally with full log snapshots"""
+        run_data = self.runs.get(run_id)
+        if run_data is None:
+            return None
+        
+        exec_logs = list(run_data["logs"])
+        if run_data["spilled"]:
+            exec_logs = self._log_spill.read(run_id) + exec_logs
+        
+        if full_state:
+            logs = self._reconstruct_logs(run_data["initial_state"], exec_logs)
+        else:
+            logs = [log.to_model() for log in exec_logs]
+        return {**run_data, "logs": logs}
+    
+    def _store_logs(self, run_id: str, execution_logs: List[_ExecLog]) -> "deque[_ExecLog]":
+        """Keep the most recent logs in memory and spill the rest to disk"""
+        spilled = len(execution_logs) - MAX_LOGS_IN_MEMORY
+        if spilled > 0:
+            self._log_spill.write(run_id, execution_logs[:spilled])
+        return deque(execution_logs, maxlen=MAX_LOGS_IN_MEMORY)
+    
+    def _sweep_runs(self) -> None:
+        """Drop stored runs (and their spilled logs) older than RUN_TTL_SECONDS"""
+        cutoff = time.monotonic() - RUN_TTL_SECONDS
+        # Runs are stored in creation order, so stop at the first live one
+        while self.runs:
+            run_id = next(iter(self.runs))
+            run_data = self.runs[run_id]
+            if run_data["created_at"] > cutoff:
+                break
+            del self.runs[run_id]
+            if run_data["spilled"]:
+                self._log_spill.delete(run_id)
+    
+    def _reconstruct_logs(
+        self, 
+        initial_state: Dict[str, Any], 
+        exec_logs: List[_ExecLog]
+    ) -> List[ExecutionLog]:
+        """Replay the logged diffs over the initial state to rebuild full snapshots"""
+        state = dict(initial_state)
+        logs = []
+        for log in exec_logs:
+            state_before = dict(state)
+            state.update(log.state_after_diff)
+            for key in log.removed_keys:
+                state.pop(key, None)
+            logs.append(log.to_model(state_before, dict(state)))
+        return logs
 
 
 # Global engine instance
@@ -1,18 +1,33 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from app.models import (
     GraphCreateRequest, GraphCreateResponse,
     GraphRunRequest, GraphRunResponse,
     StateResponse
 )
-from app.graph_engine import graph_engine
+from app.graph_engine import StateConflictError, graph_engine
 from app.workflows.code_review import get_code_review_workflow
 import uvicorn
 
+
+class _JSONResponse(ORJSONResponse):
+    """orjson response that falls back to json for values orjson rejects"""
+    
+    def render(self, content) -> bytes:
+        try:
+            return super().render(content)
+        except TypeError:
+            # e.g. integers wider than 64 bits echoed back from state
+            return JSONResponse.render(self, content)
+
+
 app = FastAPI(
     title="Workflow Engine API",
     description="A minimal workflow/graph execution engine",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson is much faster than json.dumps for large execution logs
+    default_response_class=_JSONResponse
 )
 
 # Add CORS middleware
@@ -71,8 +86,9 @@ async def create_graph(request: GraphCreateRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# Plain def: runs block (tools, parallel waits), so FastAPI runs this in its threadpool
 @app.post("/graph/run", response_model=GraphRunResponse)
-async def run_graph(request: GraphRunRequest):
+def run_graph(request: GraphRunRequest):
     """
     Run a graph with the given initial state
     
@@ -82,28 +98,37 @@ async def run_graph(request: GraphRunRequest):
         "graph_id": "uuid-here",
         "initial_state": {
             "code": "def hello():\\n    print('world')"
-        }
+        },
+        "trace": false
     }
     ```
+    
+    Set `trace` to true to get a step-by-step execution trace in the response.
     """
     try:
         result = graph_engine.run_graph(
             request.graph_id,
-            request.initial_state
+            request.initial_state,
+            request.trace
         )
         return result
+    except StateConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Plain def: reading spilled logs blocks, so FastAPI runs this in its threadpool
 @app.get("/graph/state/{run_id}", response_model=StateResponse)
-async def get_run_state(run_id: str):
+def get_run_state(run_id: str, full_state: bool = False):
     """
     Get the current state of a workflow run
+    
+    Pass `?full_state=true` to include full state snapshots in each execution log
     """
-    run_data = graph_engine.get_run_state(run_id)
+    run_data = graph_engine.get_run_state(run_id, full_state)
     
     if not run_data:
         raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
@@ -14,9 +14,6 @@ class Node(BaseModel):
     node_type: NodeType = NodeType.SIMPLE
     tool_name: str
     condition: Optional[Dict[str, Any]] = None  # For conditional/loop nodes
-    
-    class Config:
-        use_enum_values = True
 
 
 class Edge(BaseModel):
@@ -30,6 +27,8 @@ class GraphDefinition(BaseModel):
     edges: List[Edge]
     start_node: str
     end_nodes: List[str]
+    # Run independent simple nodes concurrently (acyclic graphs only)
+    parallel: bool = False
 
 
 class GraphCreateRequest(BaseModel):
@@ -45,13 +44,19 @@ class GraphCreateResponse(BaseModel):
 class GraphRunRequest(BaseModel):
     graph_id: str
     initial_state: Dict[str, Any]
+    trace: bool = False  # Return a step-by-step execution trace
 
 
 class ExecutionLog(BaseModel):
     node_name: str
-    state_before: Dict[str, Any]
-    state_after: Dict[str, Any]
+    # Only the keys changed by the node: previous values and new values
+    state_before_diff: Dict[str, Any]
+    state_after_diff: Dict[str, Any]
+    removed_keys: List[str] = []  # Deleted by the node, old values are in state_before_diff
     timestamp: str
+    # Full snapshots, only reconstructed when explicitly requested
+    state_before: Optional[Dict[str, Any]] = None
+    state_after: Optional[Dict[str, Any]] = None
 
 
 class GraphRunResponse(BaseModel):
@@ -59,6 +64,7 @@ class GraphRunResponse(BaseModel):
     final_state: Dict[str, Any]
     execution_logs: List[ExecutionLog]
     status: str
+    trace: Optional[List[str]] = None
 
 
 class StateResponse(BaseModel):
@@ -0,0 +1,117 @@
+"""
+Line scanner used by the code review tools.
+
+Uses a Numba kernel over the UTF-8 bytes of the code when numba is installed,
+and falls back to a pure Python scan otherwise.
+"""
+
+import re
+from typing import List, NamedTuple
+
+try:
+    import numpy as np
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Control flow keywords as whole (ASCII) words, e.g. 'if' but not 'notify'
+_CF_RE = re.compile(r'\b(?:if|elif|for|while)\b', re.ASCII)
+
+
+class LineScan(NamedTuple):
+    """Per-line results of scanning a code string split on newlines"""
+    starts: List[int]  # Character offset of each line in the code
+    lengths: List[int]  # Length of each line in characters
+    control_flow: List[bool]  # Line contains the word 'if', 'elif', 'for' or 'while'
+
+
+def _scan_python(code: str) -> LineScan:
+    """Pure Python fallback scan"""
+    starts, lengths, control_flow = [], [], []
+    offset = 0
+    for line in code.split('\n'):
+        starts.append(offset)
+        lengths.append(len(line))
+        control_flow.append(_CF_RE.search(line) is not None)
+        offset += len(line) + 1
+    return LineScan(starts, lengths, control_flow)
+
+
+if HAS_NUMBA:
+    _KEYWORDS = (
+        np.frombuffer(b"if", dtype=np.uint8),
+        np.frombuffer(b"elif", dtype=np.uint8),
+        np.frombuffer(b"for", dtype=np.uint8),
+        np.frombuffer(b"while", dtype=np.uint8),
+    )
+
+    @njit(cache=True)
+    def _is_word_byte(b):
+        """Match the ASCII \\w class used by _CF_RE"""
+        return (48 <= b <= 57) or (65 <= b <= 90) or (97 <= b <= 122) or b == 95
+
+    @njit(cache=True)
+    def _match_keyword(buf, i, keyword):
+        """Check for keyword at offset i as a whole word"""
+        n = buf.shape[0]
+        m = keyword.shape[0]
+        if i + m > n or (i > 0 and _is_word_byte(buf[i - 1])):
+            return False
+        for k in range(m):
+            if buf[i + k] != keyword[k]:
+                return False
+        return i + m == n or not _is_word_byte(buf[i + m])
+
+    @njit(cache=True)
+    def _scan_kernel(buf):
+        """Scan UTF-8 bytes, returning per-line starts, lengths and control flow flags"""
+        n = buf.shape[0]
+        n_lines = 1
+        for i in range(n):
+            if buf[i] == 10:  # '\n'
+                n_lines += 1
+
+        starts = np.zeros(n_lines, np.int64)
+        lengths = np.zeros(n_lines, np.int64)
+        control_flow = np.zeros(n_lines, np.bool_)
+
+        line = 0
+        chars = 0
+        for i in range(n):
+            b = buf[i]
+            if b == 10:
+                chars += 1
+                line += 1
+                starts[line] = chars
+                continue
+
+            # Count characters, not UTF-8 continuation bytes
+            if (b & 0xC0) != 0x80:
+                chars += 1
+                lengths[line] += 1
+
+            if b == 105:  # 'if'
+                if _match_keyword(buf, i, _KEYWORDS[0]):
+                    control_flow[line] = True
+            elif b == 101:  # 'elif'
+                if _match_keyword(buf, i, _KEYWORDS[1]):
+                    control_flow[line] = True
+            elif b == 102:  # 'for'
+                if _match_keyword(buf, i, _KEYWORDS[2]):
+                    control_flow[line] = True
+            elif b == 119:  # 'while'
+                if _match_keyword(buf, i, _KEYWORDS[3]):
+                    control_flow[line] = True
+
+        return starts, lengths, control_flow
+
+
+def scan_code(code: str) -> LineScan:
+    """Scan code line by line for lengths and control flow"""
+    if not HAS_NUMBA:
+        return _scan_python(code)
+
+    buf = np.frombuffer(code.encode("utf-8"), dtype=np.uint8)
+    starts, lengths, control_flow = _scan_kernel(buf)
+    return LineScan(starts.tolist(), lengths.tolist(), control_flow.tolist())
@@ -1,4 +1,11 @@
-from typing import Dict, Any, Callable
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
+from app.scanner import LineScan, scan_code
+
+logger = logging.getLogger(__name__)
 
 
 class ToolRegistry:
@@ -6,11 +13,26 @@ class ToolRegistry:
     
     def __init__(self):
         self._tools: Dict[str, Callable] = {}
-    
-    def register(self, name: str, func: Callable):
-        """Register a new tool"""
+        self._keys: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+    
+    def register(
+        self, 
+        name: str, 
+        func: Callable, 
+        input_keys: Optional[Sequence[str]] = None, 
+        output_keys: Optional[Sequence[str]] = None
+    ):
+        """Register a new tool
+        
+        Tools that only read input_keys and only write output_keys can declare
+        them, which lets the engine reuse their outputs when the inputs repeat.
+        """
         self._tools[name] = func
-        print(f"Tool '{name}' registered")
+        if input_keys is not None and output_keys is not None:
+            self._keys[name] = (tuple(input_keys), tuple(output_keys))
+        else:
+            self._keys.pop(name, None)
+        logger.debug("Tool '%s' registered", name)
     
     def get(self, name: str) -> Callable:
         """Get a tool by name"""
@@ -18,6 +40,10 @@ class ToolRegistry:
             raise ValueError(f"Tool '{name}' not found")
         return self._tools[name]
     
+    def get_keys(self, name: str) -> Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+        """Get a tool's declared (input_keys, output_keys), if any"""
+        return self._keys.get(name)
+    
     def list_tools(self) -> list:
         """List all registered tools"""
         return list(self._tools.keys())
@@ -28,71 +54,102 @@ tool_registry = ToolRegistry()
 
 
 # Code Review Tools
-def extract_functions(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Extract functions from code"""
-    code = state.get("code", "")
-    # Simple function extraction (counts def keywords)
+@dataclass(frozen=True)
+class CodeScan:
+    """Results of a single pass over the code, shared by the code review tools"""
+    functions: List[Dict[str, Any]]
+    complexity_score: int
+    issues: List[Dict[str, Any]]
+    lines: LineScan
+
+
+# Function definitions (including async def) at the start of a line, capturing the name
+_DEF_RE = re.compile(r'^[ \t]*(?:async[ \t]+)?def[ \t]+(\w+)[ \t]*\(', re.M)
+
+
+@lru_cache(maxsize=32)
+def _scan_code_once(code: str) -> CodeScan:
+    """Extract functions, complexity and issues from code in one pass"""
+    lines = scan_code(code)
+    line_count = len(lines.lengths)
     functions = []
-    for i, line in enumerate(code.split('\n')):
-        if 'def ' in line:
-            func_name = line.split('def ')[1].split('(')[0].strip()
-            functions.append({
-                "name": func_name,
-                "line": i + 1
+    missing_docstrings = set()
+    
+    # Single regex pass for functions, counting newlines between matches
+    line_index = 0
+    last_start = 0
+    for match in _DEF_RE.finditer(code):
+        line_index += code.count('\n', last_start, match.start())
+        last_start = match.start()
+        functions.append({
+            "name": match.group(1),
+            "line": line_index + 1
+        })
+        
+        # Check for missing docstrings
+        if line_index + 1 < line_count:
+            start = lines.starts[line_index + 1]
+            next_line = code[start:start + lines.lengths[line_index + 1]].strip()
+            if not next_line.startswith('"""') and not next_line.startswith("'''"):
+                missing_docstrings.add(line_index)
+    
+    issues = []
+    for i in range(line_count):
+        # Check for long lines
+        if lines.lengths[i] > 100:
+            issues.append({
+                "line": i + 1,
+                "type": "long_line",
+                "message": "Line exceeds 100 characters"
             })
+        
+        if i in missing_docstrings:
+            issues.append({
+                "line": i + 1,
+                "type": "missing_docstring",
+                "message": "Function missing docstring"
+            })
+    
+    return CodeScan(
+        functions=functions,
+        # Simple complexity metrics: count lines with control flow statements
+        complexity_score=sum(lines.control_flow),
+        issues=issues,
+        lines=lines
+    )
+
+
+def extract_functions(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract functions from code"""
+    scan = _scan_code_once(state.get("code", ""))
+    # Copy so callers cannot mutate the cached scan
+    functions = [dict(function) for function in scan.functions]
     
     state["functions"] = functions
     state["function_count"] = len(functions)
-    print(f"Extracted {len(functions)} functions")
+    logger.debug("Extracted %d functions", len(functions))
     return state
 
 
 def check_complexity(state: Dict[str, Any]) -> Dict[str, Any]:
     """Check code complexity"""
-    code = state.get("code", "")
-    lines = code.split('\n')
-    
-    # Simple complexity metrics
-    complexity_score = 0
-    for line in lines:
-        # Count control flow statements
-        if any(keyword in line for keyword in ['if', 'for', 'while', 'elif']):
-            complexity_score += 1
+    complexity_score = _scan_code_once(state.get("code", "")).complexity_score
     
     state["complexity_score"] = complexity_score
     state["complexity_level"] = "high" if complexity_score > 10 else "medium" if complexity_score > 5 else "low"
-    print(f"Complexity score: {complexity_score} ({state['complexity_level']})")
+    logger.debug("Complexity score: %d (%s)", complexity_score, state["complexity_level"])
     return state
 
 
 def detect_issues(state: Dict[str, Any]) -> Dict[str, Any]:
     """Detect basic code issues"""
-    code = state.get("code", "")
-    issues = []
-    
-    lines = code.split('\n')
-    for i, line in enumerate(lines):
-        # Check for long lines
-        if len(line) > 100:
-            issues.append({
-                "line": i + 1,
-                "type": "long_line",
-                "message": "Line exceeds 100 characters"
-            })
-        
-        # Check for missing docstrings
-        if 'def ' in line and i + 1 < len(lines):
-            next_line = lines[i + 1].strip()
-            if not next_line.startswith('"""') and not next_line.startswith("'''"):
-                issues.append({
-                    "line": i + 1,
-                    "type": "missing_docstring",
-                    "message": "Function missing docstring"
-                })
+    scan = _scan_code_once(state.get("code", ""))
+    # Copy so callers cannot mutate the cached scan
+    issues = [dict(issue) for issue in scan.issues]
     
     state["issues"] = issues
     state["issue_count"] = len(issues)
-    print(f"Found {len(issues)} issues")
+    logger.debug("Found %d issues", len(issues))
     return state
 
 
@@ -113,7 +170,7 @@ def suggest_improvements(state: Dict[str, Any]) -> Dict[str, Any]:
         suggestions.append("Consider organizing code into multiple modules")
     
     state["suggestions"] = suggestions
-    print(f"Generated {len(suggestions)} suggestions")
+    logger.debug("Generated %d suggestions", len(suggestions))
     return state
 
 
@@ -138,13 +195,27 @@ def calculate_quality_score(state: Dict[str, Any]) -> Dict[str, Any]:
     
     state["quality_score"] = quality_score
     state["iteration"] = state.get("iteration", 0) + 1
-    print(f"Quality score: {quality_score} (iteration {state['iteration']})")
+    logger.debug("Quality score: %d (iteration %d)", quality_score, state["iteration"])
     return state
 
 
 # Register all tools
-tool_registry.register("extract_functions", extract_functions)
-tool_registry.register("check_complexity", check_complexity)
-tool_registry.register("detect_issues", detect_issues)
-tool_registry.register("suggest_improvements", suggest_improvements)
+tool_registry.register(
+    "extract_functions", extract_functions,
+    input_keys=["code"], output_keys=["functions", "function_count"]
+)
+tool_registry.register(
+    "check_complexity", check_complexity,
+    input_keys=["code"], output_keys=["complexity_score", "complexity_level"]
+)
+tool_registry.register(
+    "detect_issues", detect_issues,
+    input_keys=["code"], output_keys=["issues", "issue_count"]
+)
+tool_registry.register(
+    "suggest_improvements", suggest_improvements,
+    input_keys=["complexity_level", "issue_count", "function_count"],
+    output_keys=["suggestions"]
+)
+# Not cacheable: increments the iteration counter on every call
 tool_registry.register("calculate_quality_score", calculate_quality_score)
\ No newline at end of file